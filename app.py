@@ -1,8 +1,14 @@
 import streamlit as st
-import pandas as pd
+import polars as pl
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
+from numba import njit
+import io
 import os
+from functools import partial
+from dataclasses import dataclass
 
 # --- 1. ENTERPRISE CONFIGURATION ---
 st.set_page_config(
@@ -25,6 +31,8 @@ st.markdown("""
         text-align: center;
         box-shadow: 0 2px 4px rgba(0,0,0,0.05);
     }
+    .metric-row {display: flex; gap: 16px;}
+    .metric-row .metric-card {flex: 1;}
     .metric-val {font-size: 28px; font-weight: 700; color: #1e40af;}
     .metric-lbl {font-size: 13px; color: #64748b; text-transform: uppercase; font-weight: 600;}
     h1, h2, h3 {font-family: 'Helvetica Neue', sans-serif; color: #0f172a;}
@@ -32,14 +40,239 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Shared chart styling, registered once at import instead of per-figure updates
+pio.templates['pharmai'] = go.layout.Template(
+    layout=dict(
+        font=dict(family="'Helvetica Neue', sans-serif"),
+        colorway=['#2563eb'],
+        colorscale=dict(sequential=px.colors.sequential.Blues),
+        yaxis=dict(categoryorder='total ascending'),
+    ),
+    data=dict(scatter=[go.Scatter(line=dict(width=4))]),
+)
+# Used on its own: Streamlit's frontend layers its chart theme on top at render
+# time (theme='streamlit'), so each figure ships only these few settings
+pio.templates.default = 'pharmai'
+
 # --- 2. DATA LOADER ---
-@st.cache_data
+@st.cache_resource
 def load_data():
     if not os.path.exists('global_safety_summary.parquet'):
         return None
-    return pd.read_parquet('global_safety_summary.parquet')
+    # Held in memory with the repeated string columns dictionary-encoded, so
+    # filters and group-bys hash integer codes instead of strings. pt is an
+    # Enum over the sorted terms: its UInt16 codes index the numba kernel's
+    # arrays and compare in alphabetical order. Numeric columns are narrowed
+    # (max count ~350k) to halve the bytes every scan moves.
+    # Rows are sorted by drugname so each drug is one contiguous range.
+    lf = pl.scan_parquet('global_safety_summary.parquet')
+    pt_terms = lf.select(pl.col('pt').unique().sort()).collect().to_series()
+    return (
+        lf.with_columns(
+            pl.col('drugname').cast(pl.Categorical),
+            pl.col('pt').cast(pl.Enum(pt_terms)),
+            pl.col('count').cast(pl.UInt32),
+            pl.col('year').cast(pl.Int16),
+        )
+        .sort('drugname', maintain_order=True)
+        .collect()
+        .lazy()
+    )
+
+def _by_letter(names):
+    buckets = {}
+    for name in names:
+        letter = name[0].upper() if name[:1].isalpha() else '#'
+        buckets.setdefault(letter, []).append(name)
+    # Letters first so the default bucket is 'A', not symbols/digits
+    return dict(sorted(buckets.items(), key=lambda kv: (kv[0] == '#', kv[0])))
+
+@st.cache_resource
+def load_catalog():
+    # Sidebar options from the drugname/year columns only, so the landing
+    # page never pulls the full table into memory. Shared by reference
+    # (read-only) rather than unpickled on every rerun.
+    if not os.path.exists('global_safety_summary.parquet'):
+        return None
+    lf = pl.scan_parquet('global_safety_summary.parquet')
+    drugs, years = pl.collect_all([
+        lf.select(pl.col('drugname').unique().sort()),
+        lf.select(pl.col('year').unique().sort()),
+    ])
+    return _by_letter(drugs['drugname'].to_list()), years['year'].to_list()
+
+# count is stored as UInt32; accumulate in Int64 so sums and deltas cannot wrap
+COUNT_SUM = pl.col('count').cast(pl.Int64).sum()
+
+# Shared by reference across sessions (cache_resource), so read-only
+@dataclass(frozen=True)
+class SafetyIndex:
+    years: list
+    top10_by_drug: dict   # drugname -> DataFrame(pt, count)
+    yearly_by_drug: dict  # drugname -> DataFrame(year, count)
+    totals_by_drug: dict  # drugname -> total report count
+    top_pt_by_drug: dict  # drugname -> pt of the highest-count row
+    unique_pt_by_drug: dict  # drugname -> number of distinct pt
+    rows: pl.DataFrame    # source rows, sorted by drugname
+    row_range_by_drug: dict  # drugname -> (start, end) into rows
+    pt_terms: pl.Series   # pt code -> term
+    pt_codes: np.ndarray  # numpy views of rows for the numba kernel
+    year_vals: np.ndarray
+    counts: np.ndarray
+
+def _split(frame):
+    return {key[0]: part for key, part in frame.partition_by('drugname', as_dict=True, include_key=False).items()}
+
+@st.cache_resource
+def load_index():
+    # One whole-table pass at startup; each drug selection is then a dict lookup
+    lf = load_data()
+    top10, yearly, kpis, years = pl.collect_all([
+        # Partial top-k per drug instead of a full sort of all ~3.6M (drug, pt)
+        # sums; only the ~175k survivors are ordered (ties alphabetical)
+        lf.group_by(['drugname', 'pt']).agg(COUNT_SUM)
+          .group_by('drugname').agg(pl.col('pt', 'count').top_k_by(['count', 'pt'], k=10, reverse=[False, True]))
+          .explode('pt', 'count').sort(['count', 'pt'], descending=[True, False])
+          # Plain strings: an Enum column would carry all ~17.6k terms into every
+          # cached view (same dtype summarize() returns for narrowed periods)
+          .with_columns(pl.col('pt').cast(pl.String)),
+        lf.group_by(['drugname', 'year']).agg(COUNT_SUM).sort('year'),
+        lf.group_by('drugname').agg(
+            COUNT_SUM,
+            pl.col('pt').get(pl.col('count').arg_max()).alias('top_pt'),
+            pl.col('pt').n_unique().alias('unique_pt'),
+        ).sort('drugname'),
+        lf.select(pl.col('year').unique().sort()),
+    ])
+    all_drugs = kpis['drugname'].to_list()
+    rows = lf.collect()
+    # Names and boundaries from the same frame, so they line up by construction
+    runs = rows.group_by('drugname', maintain_order=True).len()
+    ends = runs['len'].cum_sum().to_list()
+    return SafetyIndex(
+        years=years['year'].to_list(),
+        top10_by_drug=_split(top10),
+        yearly_by_drug=_split(yearly),
+        totals_by_drug=dict(zip(all_drugs, kpis['count'].to_list())),
+        top_pt_by_drug=dict(zip(all_drugs, kpis['top_pt'].to_list())),
+        unique_pt_by_drug=dict(zip(all_drugs, kpis['unique_pt'].to_list())),
+        rows=rows,
+        row_range_by_drug=dict(zip(runs['drugname'].to_list(), zip([0] + ends[:-1], ends))),
+        pt_terms=pl.Series('pt', rows.schema['pt'].categories),
+        pt_codes=rows['pt'].to_physical().to_numpy(),
+        year_vals=rows['year'].to_numpy(),
+        counts=rows['count'].to_numpy(),
+    )
+
+@njit(cache=True)
+def _drug_kernel(pt, yr, cnt, start, end, y0, y1, n_pt):
+    # Filter + per-pt sums + per-year sums + top row, fused into one scan
+    pt_sum = np.zeros(n_pt, np.int64)
+    yr_sum = np.zeros(y1 - y0 + 1, np.int64)
+    top_row = -1
+    for i in range(start, end):
+        y = yr[i]
+        if y < y0 or y > y1:
+            continue
+        c = cnt[i]
+        pt_sum[pt[i]] += c
+        yr_sum[y - y0] += c
+        if top_row < 0 or c > cnt[top_row]:
+            top_row = i
+    return pt_sum, yr_sum, top_row
+
+def summarize(drug, y0, y1):
+    # Same aggregates for an arbitrary period (used when the period is narrowed)
+    index = load_index()
+    start, end = index.row_range_by_drug[drug]
+    pt_sum, yr_sum, top_row = _drug_kernel(
+        index.pt_codes, index.year_vals, index.counts, start, end, y0, y1, len(index.pt_terms)
+    )
+    if top_row < 0:
+        return None  # No reports in this period
+    # Every source row has count >= 1, so a non-zero sum means the pt/year is present
+    # Partial selection of the 10th-largest sum, then order only the candidates;
+    # the stable sort over ascending codes breaks ties alphabetically, like the index
+    kth = np.partition(pt_sum, -10)[-10]
+    cand = np.flatnonzero(pt_sum >= max(kth, 1))
+    top = cand[np.argsort(-pt_sum[cand], kind='stable')[:10]]
+    top_10 = pl.DataFrame({'pt': index.pt_terms.gather(top), 'count': pt_sum[top]})
+    present = np.flatnonzero(yr_sum)
+    trend = pl.DataFrame({'year': (present + y0).astype(np.int16), 'count': yr_sum[present]})
+    top_pt = index.pt_terms[int(index.pt_codes[top_row])]
+    return top_10, trend, int(yr_sum.sum()), top_pt, int(np.count_nonzero(pt_sum))
+
+def select_rows(drug, y0, y1):
+    # Zero-copy slice of this drug's range; the year filter only scans those rows
+    index = load_index()
+    start, end = index.row_range_by_drug[drug]
+    return index.rows.slice(start, end - start).filter(pl.col('year').is_between(y0, y1))
 
-df = load_data()
+# Everything the page shows for (drug, period); display toggles never recompute it
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_view(drug, y0, y1):
+    index = load_index()
+    if (y0, y1) == (index.years[0], index.years[-1]):
+        # Full period: served from the precomputed index, no group-by
+        top_10 = index.top10_by_drug[drug]
+        trend = index.yearly_by_drug[drug]
+        total = index.totals_by_drug[drug]
+        top_pt = index.top_pt_by_drug[drug]
+        unique_pt = index.unique_pt_by_drug[drug]
+    else:
+        summary = summarize(drug, y0, y1)
+        if summary is None:
+            return None
+        top_10, trend, total, top_pt, unique_pt = summary
+
+    # Yearly Growth Calculation
+    yearly_counts = trend['count']
+    growth = None
+    if len(yearly_counts) > 1:
+        growth = ((yearly_counts[-1] - yearly_counts[0]) / yearly_counts[0]) * 100
+
+    return {'top10': top_10, 'yearly': trend, 'total': total, 'top_pt': top_pt, 'unique_pt': unique_pt, 'growth': growth}
+
+# Figures are keyed on (drug, period) only, so unrelated widget toggles reuse them
+# Plotly >= 6 consumes the Arrow-backed Polars frames directly, no pandas copy
+@st.cache_data(max_entries=64)
+def _bar_fig(drug, y0, y1):
+    top_10 = compute_view(drug, y0, y1)['top10']
+    fig_bar = px.bar(
+        top_10, x='count', y='pt', orientation='h',
+        title=f"Top 10 Most Frequent Adverse Events for {drug}",
+        labels={'count': 'Report Count', 'pt': 'MedDRA Preferred Term'},
+        text='count',
+        color='count',
+        height=500
+    )
+    return fig_bar
+
+@st.cache_data(max_entries=64)
+def _line_fig(drug, y0, y1):
+    trend = compute_view(drug, y0, y1)['yearly']
+    fig_line = px.line(
+        trend.with_columns(pl.col('year').cast(pl.String)),  # Category axis, so years don't show as decimals
+        x='year', y='count', markers=True,
+        title="Reporting Volume Over Time",
+        labels={'count': 'Total Reports', 'year': 'Year'},
+        line_shape='spline'
+    )
+    return fig_line
+
+# Raw viewer rows, sorted once per (drug, period) and handed to st.dataframe as Arrow
+@st.cache_data(max_entries=64, show_spinner=False)
+def _raw_rows(drug, y0, y1):
+    rows = select_rows(drug, y0, y1).sort('count', descending=True)
+    # Plain strings: a dictionary column would ship every category with the slice
+    return rows.with_columns(pl.col('drugname', 'pt').cast(pl.String)).to_arrow()
+
+# Export is only serialized when the download button is actually clicked
+@st.cache_data(max_entries=64, show_spinner=False)
+def _csv(drug, y0, y1):
+    buf = io.BytesIO()
+    select_rows(drug, y0, y1).write_csv(buf)
+    return buf.getvalue()
 
 # --- 3. SIDEBAR (PROFESSIONAL TOOLS) ---
 with st.sidebar:
@@ -47,16 +280,18 @@ with st.sidebar:
     st.caption("Global Pharmacovigilance Suite")
     st.markdown("---")
     
-    if df is None:
+    catalog = load_catalog()
+    if catalog is None:
         st.error("🚨 Database Offline. Please upload 'global_safety_summary.parquet'.")
         st.stop()
 
-    # Search Tool
-    all_drugs = sorted(df['drugname'].unique())
-    selected_drug = st.selectbox("Select Therapeutic Agent:", ["Type to search..."] + all_drugs)
+    drugs_by_letter, years = catalog
+
+    # Search Tool (bucketed by first letter so only one bucket ships per rerun)
+    letter = st.selectbox("Drug Index:", list(drugs_by_letter))
+    selected_drug = st.selectbox("Select Therapeutic Agent:", ["Type to search..."] + drugs_by_letter[letter])
     
     # Filter Tool (Time Range)
-    years = sorted(df['year'].unique())
     selected_years = st.select_slider("Analysis Period:", options=years, value=(min(years), max(years)))
     
     st.markdown("---")
@@ -67,9 +302,8 @@ with st.sidebar:
 # --- 4. MAIN ANALYTICS ENGINE ---
 if selected_drug and selected_drug != "Type to search...":
     
-    # Filter Data based on User Selection
-    mask = (df['drugname'] == selected_drug) & (df['year'].between(selected_years[0], selected_years[1]))
-    data = df[mask]
+    # Aggregates for the selection (cached; checkboxes below only toggle display)
+    view = compute_view(selected_drug, *selected_years)
     
     # Header
     c1, c2 = st.columns([3, 1])
@@ -77,41 +311,34 @@ if selected_drug and selected_drug != "Type to search...":
     c1.markdown(f"**Data Source:** FDA FAERS | **Period:** {selected_years[0]} - {selected_years[1]}")
     
     # Export Button
-    csv = data.to_csv(index=False).encode('utf-8')
     c2.download_button(
         label="📥 Download Report",
-        data=csv,
+        data=partial(_csv, selected_drug, *selected_years),
         file_name=f"{selected_drug}_safety_report.csv",
         mime="text/csv"
     )
 
-    if data.empty:
+    if view is None:
         st.warning("No reports found for this time period.")
         st.stop()
 
     st.markdown("---")
 
     # KPIs (Key Performance Indicators)
-    total_events = data['count'].sum()
-    top_event_row = data.loc[data['count'].idxmax()]
-    unique_pt = data['pt'].nunique()
-    
-    # Yearly Growth Calculation
-    yearly_counts = data.groupby('year')['count'].sum()
-    if len(yearly_counts) > 1:
-        growth = ((yearly_counts.iloc[-1] - yearly_counts.iloc[0]) / yearly_counts.iloc[0]) * 100
+    total_events, unique_pt, top_pt, growth = view['total'], view['unique_pt'], view['top_pt'], view['growth']
+    if growth is not None:
         growth_str = f"{growth:+.1f}%"
         growth_color = "red" if growth > 0 else "green"
     else:
         growth_str = "N/A"
         growth_color = "black"
 
-    # KPI Display
-    kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-    kpi1.markdown(f'<div class="metric-card"><div class="metric-lbl">Total ICSRs</div><div class="metric-val">{total_events:,}</div></div>', unsafe_allow_html=True)
-    kpi2.markdown(f'<div class="metric-card"><div class="metric-lbl">Unique Signals</div><div class="metric-val">{unique_pt:,}</div></div>', unsafe_allow_html=True)
-    kpi3.markdown(f'<div class="metric-card"><div class="metric-lbl">Top Adverse Event</div><div class="metric-val" style="font-size:20px">{top_event_row["pt"]}</div></div>', unsafe_allow_html=True)
-    kpi4.markdown(f'<div class="metric-card"><div class="metric-lbl">Volume Trend</div><div class="metric-val" style="color:{growth_color}">{growth_str}</div></div>', unsafe_allow_html=True)
+    # KPI Display (one flex row, emitted as a single element)
+    kpi1 = f'<div class="metric-card"><div class="metric-lbl">Total ICSRs</div><div class="metric-val">{total_events:,}</div></div>'
+    kpi2 = f'<div class="metric-card"><div class="metric-lbl">Unique Signals</div><div class="metric-val">{unique_pt:,}</div></div>'
+    kpi3 = f'<div class="metric-card"><div class="metric-lbl">Top Adverse Event</div><div class="metric-val" style="font-size:20px">{top_pt}</div></div>'
+    kpi4 = f'<div class="metric-card"><div class="metric-lbl">Volume Trend</div><div class="metric-val" style="color:{growth_color}">{growth_str}</div></div>'
+    st.markdown(f'<div class="metric-row">{kpi1}{kpi2}{kpi3}{kpi4}</div>', unsafe_allow_html=True)
 
     st.markdown("### 📈 Visual Intelligence")
 
@@ -120,35 +347,16 @@ if selected_drug and selected_drug != "Type to search...":
 
     with tab1:
         # Interactive Bar Chart (Top 10)
-        top_10 = data.groupby('pt')['count'].sum().nlargest(10).reset_index()
-        fig_bar = px.bar(
-            top_10, x='count', y='pt', orientation='h',
-            title=f"Top 10 Most Frequent Adverse Events for {selected_drug}",
-            labels={'count': 'Report Count', 'pt': 'MedDRA Preferred Term'},
-            text='count',
-            color='count',
-            color_continuous_scale='Blues'
-        )
-        fig_bar.update_layout(yaxis={'categoryorder':'total ascending'}, height=500)
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(_bar_fig(selected_drug, *selected_years), width='stretch')
 
     with tab2:
         # Interactive Line Chart
-        trend_data = data.groupby('year')['count'].sum().reset_index()
-        fig_line = px.line(
-            trend_data, x='year', y='count', markers=True,
-            title="Reporting Volume Over Time",
-            labels={'count': 'Total Reports', 'year': 'Year'},
-            line_shape='spline'
-        )
-        fig_line.update_traces(line_color='#2563eb', line_width=4)
-        fig_line.update_xaxes(type='category') # Ensure years don't show as decimals
-        st.plotly_chart(fig_line, use_container_width=True)
+        st.plotly_chart(_line_fig(selected_drug, *selected_years), width='stretch')
 
     # Raw Data Expander
     if show_raw:
         st.markdown("### 📂 Source Data Inspector")
-        st.dataframe(data.sort_values(by='count', ascending=False), use_container_width=True)
+        st.dataframe(_raw_rows(selected_drug, *selected_years), width='stretch')
 
 else:
     # Landing Page State
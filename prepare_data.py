@@ -0,0 +1,35 @@
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import os
+import sys
+
+# Optional offline step: rewrite a FAERS export into a push-down friendly
+# layout. app.py re-sorts on load and reads the whole file, so it does not
+# depend on this; it helps readers that filter by drug at the parquet level.
+#   * sorted by drugname, so each drug is one contiguous run of rows
+#   * drugname/pt dictionary-encoded (small cardinality, heavily repeated)
+#   * row groups small enough that min/max statistics let readers skip
+#     every group that cannot contain the requested drug
+# Usage: python prepare_data.py [path]
+
+PATH = 'global_safety_summary.parquet'
+ROW_GROUP_SIZE = 256 * 1024
+
+def main(path=PATH):
+    table = pq.read_table(path)
+    # sort_indices is stable, so rows keep their original order within a drug
+    table = table.take(pc.sort_indices(table, sort_keys=[('drugname', 'ascending')]))
+    # Write a sibling file and swap it in, so a failed write never truncates the dataset
+    tmp_path = path + '.tmp'
+    pq.write_table(
+        table, tmp_path,
+        row_group_size=ROW_GROUP_SIZE,
+        use_dictionary=['drugname', 'pt'],
+        compression='zstd',
+        write_statistics=True,
+    )
+    os.replace(tmp_path, path)
+    print(f"✅ Wrote {table.num_rows:,} rows to {path} ({pq.ParquetFile(path).num_row_groups} row groups)")
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])